@@ -2,10 +2,6 @@
 import sys
 import numpy as np
 from sklearn.utils.testing import assert_array_equal
-from matplotlib import pyplot as plt
-import seaborn  # NOQA
-
-plt.ion()
 
 
 def r_input(val):
@@ -49,6 +45,10 @@ def trace_plot(precisions, path, n_edges=20, ground_truth=None, edges=[]):
 
         If non-empty, n_edges and ground_truth will be ignored.
     """
+    # import plotting libraries lazily so importing this module stays cheap
+    from matplotlib import pyplot as plt
+    import seaborn  # NOQA
+
     _check_path(path)
     assert len(path) == len(precisions)
     assert len(precisions) > 0
@@ -102,6 +102,7 @@ def trace_plot(precisions, path, n_edges=20, ground_truth=None, edges=[]):
     # remove any zero rows
     coeffs = coeffs[np.linalg.norm(coeffs, axis=1) > 1e-10, :]
 
+    plt.ion()
     plt.figure()
 
     # show coefficients as a function of lambda
@@ -1,5 +1,6 @@
 import numpy as np
 import scipy as sp
+from scipy.linalg.lapack import dpotrf, dpotri
 
 
 def lattice(prng, n_features, alpha, random_sign=False, low=0.3, high=0.7):
@@ -117,9 +118,9 @@ def _rescale_to_unit_diagonals(mat):
 
     Note: Call only after diagonal dominance is ensured.
     """
-    d = np.sqrt(np.diag(mat))
-    mat /= d
-    mat /= d[:, np.newaxis]
+    inv_d = 1.0 / np.sqrt(np.diag(mat))
+    mat *= inv_d
+    mat *= inv_d[:, np.newaxis]
     return mat
 
 
@@ -162,7 +163,14 @@ class Graph(object):
         return dd_adj
 
     def to_covariance(self, precision, rescale=True):
-        covariance = np.linalg.inv(precision)
+        # invert via cholesky, which doubles as the check that precision is
+        # spd. only the lower triangle of the inverse is populated by dpotri
+        chol, info = dpotrf(precision, lower=1, clean=1)
+        if info != 0:
+            raise np.linalg.LinAlgError("Precision is not positive definite.")
+
+        covariance, info = dpotri(chol, lower=1)
+        covariance = np.tril(covariance) + np.tril(covariance, -1).T
 
         if rescale:
             return _rescale_to_unit_diagonals(covariance)
@@ -197,11 +205,25 @@ class Graph(object):
             )
             return
 
-        block_adj = self.prototype_adjacency(n_block_features, alpha)
-        adjacency = blocks(
-            self.prng, block_adj, n_blocks=self.n_blocks, chain_blocks=self.chain_blocks
-        )
+        # in the unlikely event that we draw a precision that is not positive
+        # definite, we redraw the graph up to MAX_ATTEMPTS=5 times before
+        # raising, rather than returning a meaningless covariance.
+        MAX_ATTEMPTS = 5
+        for attempt in range(MAX_ATTEMPTS):
+            block_adj = self.prototype_adjacency(n_block_features, alpha)
+            adjacency = blocks(
+                self.prng,
+                block_adj,
+                n_blocks=self.n_blocks,
+                chain_blocks=self.chain_blocks,
+            )
+
+            precision = self.to_precision(adjacency)
+            try:
+                covariance = self.to_covariance(precision)
+                break
+            except np.linalg.LinAlgError:
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
 
-        precision = self.to_precision(adjacency)
-        covariance = self.to_covariance(precision)
         return covariance, precision, adjacency
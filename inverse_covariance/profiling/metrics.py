@@ -20,12 +20,10 @@ def _nonzero_intersection(m, m_hat):
     m_hat_no_diag = m_hat.copy()
     m_hat_no_diag[np.diag_indices(n_features)] = 0
 
-    m_hat_nnz = len(np.nonzero(m_hat_no_diag.flat)[0])
-    m_nnz = len(np.nonzero(m_no_diag.flat)[0])
+    m_hat_nnz = np.count_nonzero(m_hat_no_diag)
+    m_nnz = np.count_nonzero(m_no_diag)
 
-    intersection_nnz = len(
-        np.intersect1d(np.nonzero(m_no_diag.flat)[0], np.nonzero(m_hat_no_diag.flat)[0])
-    )
+    intersection_nnz = np.count_nonzero(np.logical_and(m_no_diag, m_hat_no_diag))
 
     return m_nnz, m_hat_nnz, intersection_nnz
 
@@ -56,9 +54,13 @@ def support_difference_count(m, m_hat):
 
 def has_exact_support(m, m_hat):
     """Returns 1 if support_difference_count is zero, 0 else.
+
+    Compares the off-diagonal support masks directly rather than counting
+    the intersection of nonzero indices.
     """
-    m_nnz, m_hat_nnz, intersection_nnz = _nonzero_intersection(m, m_hat)
-    return int((m_nnz + m_hat_nnz - (2 * intersection_nnz)) == 0)
+    support_diff = np.not_equal(m != 0, m_hat != 0)
+    np.fill_diagonal(support_diff, False)
+    return int(not support_diff.any())
 
 
 def has_approx_support(m, m_hat, prob=0.01):
@@ -2,7 +2,8 @@ from __future__ import absolute_import
 
 import numpy as np
 from functools import partial
-from sklearn.base import clone
+from scipy.linalg import get_blas_funcs
+from sklearn.base import BaseEstimator, clone
 from sklearn.externals.joblib import Parallel, delayed
 
 from .metrics import error_fro
@@ -10,58 +11,112 @@ from .erdos_renyi_graph import ErdosRenyiGraph
 from .. import QuicGraphicalLasso, QuicGraphicalLassoCV
 
 
-def _sample_mvn(n_samples, cov, prng):
+def _sample_mvn(n_samples, cov_chol, prng):
     """Draw a multivariate normal sample from the graph defined by cov.
 
+    Samples are generated as Z * L^T from standard normal draws Z, avoiding
+    the decomposition multivariate_normal would recompute on every call. The
+    product is computed in place with a triangular BLAS multiply (trmm).
+    The sample has the same dtype as cov_chol. It is left raw (not centered
+    or scaled). Any standardization is up to the estimator's init_method.
+
     Parameters
     -----------
     n_samples : int
 
-    cov : matrix of shape (n_features, n_features)
-        Covariance matrix of the graph.
+    cov_chol : matrix of shape (n_features, n_features)
+        Lower triangular Cholesky factor L of the covariance matrix of the
+        graph, cov = L * L^T.
 
     prng : np.random.RandomState instance.
     """
-    n_features, _ = cov.shape
-    return prng.multivariate_normal(np.zeros(n_features), cov, size=n_samples)
+    n_features, _ = cov_chol.shape
+    # draw Z in fortran order so trmm can overwrite it without a copy
+    Z = prng.standard_normal((n_features, n_samples)).astype(cov_chol.dtype).T
+    trmm = get_blas_funcs("trmm", (cov_chol,))
+    return trmm(1.0, cov_chol, Z, side=1, lower=1, trans_a=1, overwrite_b=1)
 
 
-def _ms_fit(indexed_params, estimator, n_features, graph, prng):
+def _ms_fit(indexed_params, estimator, n_features, warm_start, prng):
     # unpack params
-    index, (alpha, grid_point) = indexed_params
-
-    # draw a new fixed graph for alpha
-    cov, prec, adj = graph.create(n_features, alpha)
+    index, ((graph, cov_chol), grid_points) = indexed_params
 
     # model selection (once per n_samples grid point)
-    n_samples = int(grid_point * n_features)
-    X = _sample_mvn(n_samples, cov, prng)
     ms_estimator = clone(estimator)
-    ms_estimator.fit(X)
+    results = []
+    for grid_point in grid_points:
+        n_samples = int(grid_point * n_features)
+        X = _sample_mvn(n_samples, cov_chol, prng)
+        ms_estimator.fit(X)
+        results.append((graph, cov_chol, ms_estimator.lam_, n_samples))
+
+        if warm_start:
+            # search a narrow path around the selected penalty for the next
+            # (larger) n_samples grid point. lams scale ms_estimator.lam and
+            # must be decreasing
+            prev_path_lam = np.max(ms_estimator.lam_) / np.max(ms_estimator.lam)
+            ms_estimator.set_params(lams=prev_path_lam * np.linspace(1.5, 0.5, 5))
+
+    return index, results
 
-    return index, ((cov, prec, adj), ms_estimator.lam_, n_samples)
 
+def _clone_nested(value):
+    """Clone a parameter value if it is, or holds, an estimator instance.
+
+    Other values (including estimator classes) are returned as is.
+    """
+    if isinstance(value, BaseEstimator):
+        return clone(value, safe=False)
+
+    if isinstance(value, (list, tuple)) and any(
+        isinstance(v, BaseEstimator) for v in value
+    ):
+        return clone(value, safe=False)
 
-def _mc_fit(indexed_params, estimator, metrics, prng):
+    return value
+
+
+def _mc_fit(indexed_params, metrics, prng):
     # unpack params
-    index, (nn, (cov, prec, adj), lam, n_samples) = indexed_params
+    index, (nn, (cov, prec, adj), cov_chol, estimator, n_samples) = indexed_params
+    estimator_class, estimator_params = estimator
 
     # compute mc trial
-    X = _sample_mvn(n_samples, cov, prng)
-    mc_estimator = clone(estimator)
-    mc_estimator.set_params(lam=lam)
+    # NOTE: samples are drawn here rather than batched across trials up
+    # front; a batch holds n_trials * n_samples * n_features values (~200MB
+    # in float32 for the largest default grid point) that would be shipped
+    # to workers.
+    X = _sample_mvn(n_samples, cov_chol, prng)
+    # nested estimators are still cloned so that no trial shares (and fits)
+    # the user's instance, other parameters are passed through as is
+    mc_estimator = estimator_class(
+        **{k: _clone_nested(v) for k, v in estimator_params.items()}
+    )
     mc_estimator.fit(X)
     results = {k: f(prec, mc_estimator.precision_) for k, f in metrics.items()}
 
     return index, results
 
 
-def _cpu_map(fun, param_grid, n_jobs, verbose):
-    return Parallel(
-        n_jobs=n_jobs,
-        verbose=verbose,
-        backend="threading",  # any sklearn backend should work here
-    )(delayed(fun)(params) for params in param_grid)
+def _seeded_fit(fun, indexed_params, seed):
+    """Call fun with a RandomState seeded by seed + the parameter index."""
+    index, _ = indexed_params
+    return fun(indexed_params, prng=np.random.RandomState(seed + index))
+
+
+def _cpu_map(fun, indexed_param_grid, n_jobs, verbose, seed, backend):
+    """Each task gets its own newly seeded RandomState (seed + index) rather
+    than a shared instance, so that the samples drawn for each task are
+    independent of n_jobs and the joblib backend (process based backends
+    would otherwise receive identical copies of a shared instance).
+
+    This only covers the sampling RandomState. Randomness inside the
+    estimators themselves (e.g. the cross-validation splits of
+    QuicGraphicalLassoCV, which use the global numpy RNG) is not seeded here.
+    """
+    return Parallel(n_jobs=n_jobs, verbose=verbose, backend=backend)(
+        delayed(_seeded_fit)(fun, params, seed) for params in indexed_param_grid
+    )
 
 
 def _spark_map(fun, indexed_param_grid, sc, seed):
@@ -92,9 +147,11 @@ class MonteCarloProfile(object):
     """Compute performance metrics over multiple random trials (multivariate
     normal sample instances for a given graph).
 
-    The graph is sampled once to obtain a penalty (via the ms_estimator) and
-    then sampled and fit for n_trials for each (alpha, n_samples) parameter
-    pair.
+    One graph is drawn for each alpha and shared by all n_samples grid points
+    of that alpha (rather than drawing an independent graph for every
+    (alpha, n_samples) pair). For each (alpha, n_samples) parameter pair, the
+    graph is sampled once to obtain a penalty (via the ms_estimator) and then
+    sampled and fit for n_trials.
 
     Parameters
     -----------
@@ -117,7 +174,8 @@ class MonteCarloProfile(object):
 
     graph :  An instance of a class with the method .create(n_features, alpha)
         that returns (cov, prec, adj).
-        graph.create() will be used to draw a new graph instance in each trial.
+        graph.create() will be used to draw a new graph instance for each
+        alpha.
         default: ErdosRenyiGraph()
 
     n_samples_grid : int (default=10) or array of floats
@@ -146,6 +204,20 @@ class MonteCarloProfile(object):
 
     seed : np.random.RandomState starting seed. (default=2)
 
+    ms_warm_start : bool (default=False)
+        If True, model selection for each alpha runs over the n_samples grid
+        in order, and each search is restricted to a narrow path
+        (0.5 to 1.5 times) around the penalty selected for the previous grid
+        point. Requires an ms_estimator with a 'lams' parameter, such as
+        QuicGraphicalLassoCV, and a strictly increasing n_samples_grid.
+        Model selection is then parallelized over alphas only.
+
+    backend : string, optional (default=threading)
+        Joblib parallelization backend.
+        Process based backends (e.g. 'multiprocessing' or 'loky') can run
+        trials truly in parallel, but require picklable graph, metrics and
+        estimators.
+        Not used when using the sparkContext (sc).
 
     Attributes
     ----------
@@ -155,8 +227,14 @@ class MonteCarloProfile(object):
     alphas_ : array of size (alpha_grid, ) or alpha_grid
         Array of alphas used to generate graphs.
 
-    precision_nnz_ : array of size (len(alphas_), )
-        The sparsity of each test graph precision.
+    precision_nnz_ : list of size (len(alphas_) * len(grid_), )
+        The sparsity of the test graph precision for each (alpha, n_samples)
+        pair, ordered by alpha then n_samples. Since graphs are shared across
+        n_samples, each alpha's value is repeated len(grid_) times.
+
+    lams_ : list of size (len(alphas_) * len(grid_), )
+        The penalty selected by ms_estimator for each (alpha, n_samples) pair
+        (used as lam in that pair's trials), ordered as precision_nnz_.
 
     results_ : dict of matrices of size (len(alphas_), len(grid_))
         Each key corresponds to a function from metrics.
@@ -176,6 +254,8 @@ class MonteCarloProfile(object):
         n_jobs=1,
         sc=None,
         seed=2,
+        ms_warm_start=False,
+        backend="threading",
     ):
         self.n_features = n_features
         self.n_trials = n_trials
@@ -189,7 +269,8 @@ class MonteCarloProfile(object):
         self.n_jobs = n_jobs
         self.sc = sc
         self.seed = seed
-        self.prng = np.random.RandomState(seed)
+        self.ms_warm_start = ms_warm_start
+        self.backend = backend
 
         if self.graph is None:
             self.graph = ErdosRenyiGraph()
@@ -215,6 +296,7 @@ class MonteCarloProfile(object):
         self.is_fitted = False
         self.results_ = None
         self.precision_nnz_ = None
+        self.lams_ = None
 
     def fit(self, X=None, y=None):
         n_alphas = len(self.alphas_)
@@ -223,16 +305,37 @@ class MonteCarloProfile(object):
         self.precision_nnz_ = []
         self.results_ = {k: np.zeros((n_alphas, n_grids)) for k in self.metrics}
 
+        # draw a new fixed graph for each alpha and factor its covariance
+        # once, reused by every grid point and trial of that alpha.
+        # samples are drawn in single precision, which is ample for support
+        # recovery and halves the memory traffic of sampling.
+        graphs = []
+        for alpha in self.alphas_:
+            cov, prec, adj = self.graph.create(self.n_features, alpha)
+            cov_chol = np.linalg.cholesky(cov).astype(np.float32)
+            graphs.append(((cov, prec, adj), cov_chol))
+
         # build an indexed set (or generator) of grid points
-        param_grid = [(a, g) for a in self.alphas_ for g in self.grid_]
+        # with ms_warm_start, each alpha is a single task that walks the
+        # n_samples grid in order
+        if self.ms_warm_start:
+            if "lams" not in self.ms_estimator.get_params():
+                raise ValueError("ms_warm_start requires an ms_estimator with 'lams'.")
+
+            if np.any(np.diff(self.grid_) <= 0):
+                raise ValueError("ms_warm_start requires an increasing n_samples_grid.")
+
+            param_grid = [(graph, self.grid_) for graph in graphs]
+        else:
+            param_grid = [(graph, [g]) for graph in graphs for g in self.grid_]
+
         indexed_param_grid = list(zip(range(len(param_grid)), param_grid))
 
         ms_fit = partial(
             _ms_fit,
             estimator=self.ms_estimator,
             n_features=self.n_features,
-            graph=self.graph,
-            prng=self.prng,
+            warm_start=self.ms_warm_start,
         )
 
         if self.verbose:
@@ -241,30 +344,52 @@ class MonteCarloProfile(object):
         if self.sc is not None:
             ms_results = _spark_map(ms_fit, indexed_param_grid, self.sc, self.seed)
         else:
-            ms_results = _cpu_map(ms_fit, indexed_param_grid, self.n_jobs, self.verbose)
+            ms_results = _cpu_map(
+                ms_fit,
+                indexed_param_grid,
+                self.n_jobs,
+                self.verbose,
+                self.seed,
+                self.backend,
+            )
 
-        # ensure results are ordered
+        # ensure results are ordered and flatten to one per grid point
         ms_results = sorted(ms_results, key=lambda r: r[0])
+        ms_results = [r for _, results in ms_results for r in results]
 
-        # track nnz of graph precision
+        # track nnz of graph precision and selected penalties
         self.precision_nnz_ = [
-            np.count_nonzero(graph[1].flat) for _, (graph, _, _) in ms_results
+            np.count_nonzero(graph[1]) for (graph, _, _, _) in ms_results
+        ]
+        self.lams_ = [lam for (_, _, lam, _) in ms_results]
+
+        # snapshot the trial estimator class and parameters once per param
+        # grid point so each trial constructs it directly (cheaper than
+        # clone). nested estimators are cloned per trial in _mc_fit
+        mc_estimator_class = type(self.mc_estimator)
+        mc_estimator_params = self.mc_estimator.get_params(deep=False)
+        trial_estimators = [
+            (mc_estimator_class, dict(mc_estimator_params, lam=lam))
+            for (_, _, lam, _) in ms_results
         ]
 
         # build param grid for mc trials
         # following results in an grid where nn indexes each trial of each
         # param grid:
-        #  (0, graph_0, lam_0, n_samples_), (1, graph_0, lam_0, n_samples_0),..
+        #  (0, graph_0, chol_0, estimator_0, n_samples_0),
+        #  (1, graph_0, chol_0, estimator_0, n_samples_0),..
         trial_param_grid = [
-            (nn, graph, lam, n_samples)
-            for _, (graph, lam, n_samples) in ms_results
+            (nn, graph, cov_chol, trial_estimator, n_samples)
+            for (graph, cov_chol, _, n_samples), trial_estimator in zip(
+                ms_results, trial_estimators
+            )
             for nn in range(self.n_trials)
         ]
         indexed_trial_param_grid = list(
             zip(range(len(trial_param_grid)), trial_param_grid)
         )
 
-        mc_fit = partial(_mc_fit, estimator=self.mc_estimator, metrics=self.metrics)
+        mc_fit = partial(_mc_fit, metrics=self.metrics)
 
         if self.verbose:
             print("Fitting MC trials...")
@@ -275,35 +400,32 @@ class MonteCarloProfile(object):
             )
         else:
             mc_results = _cpu_map(
-                partial(mc_fit, prng=self.prng),
+                mc_fit,
                 indexed_trial_param_grid,
                 self.n_jobs,
                 self.verbose,
+                self.seed + len(param_grid),
+                self.backend,
             )
 
-        # ensure results are ordered correctly
-        mc_results = sorted(mc_results, key=lambda r: r[0])
-
-        # strip mc_results
-        mc_results = [r for _, r in mc_results]
-
-        # reduce
-        param_grid_matrix_index = [
-            (a, g) for a in range(len(self.alphas_)) for g in range(len(self.grid_))
-        ]
-        for param_index in range(len(param_grid)):
-            trial_start = param_index * self.n_trials
-            trials = mc_results[trial_start : trial_start + self.n_trials]
-            aidx, gidx = param_grid_matrix_index[param_index]
+        # reduce: write each trial into a preallocated buffer at its index
+        # (no sorting needed), trials of param grid point p are at
+        # p * n_trials + nn
+        trial_results = {
+            key: np.empty((len(trial_param_grid),)) for key in self.metrics
+        }
+        for index, results in mc_results:
             for key in self.metrics:
-                results_by_key = np.array([t[key] for t in trials])
-                self.results_[key][aidx, gidx] = (
-                    1. * np.sum(results_by_key) / self.n_trials
-                )
+                trial_results[key][index] = results[key]
+
+        for key in self.metrics:
+            self.results_[key][:] = (
+                trial_results[key].reshape((n_alphas, n_grids, self.n_trials)).mean(2)
+            )
 
         if self.verbose:
             for key in self.metrics:
-                print("Results for {}: {}".format(key, self.results_[key][aidx, :]))
+                print("Results for {}: {}".format(key, self.results_[key][-1, :]))
 
         self.is_fitted = True
         return self
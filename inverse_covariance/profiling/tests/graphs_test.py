@@ -154,3 +154,32 @@ class TestGraphs(object):
         assert np.sum(adjacency.flat) > 0
         if seed is not None:
             assert graph.seed == seed
+
+    def test_graph_to_covariance(self):
+        graph = LatticeGraph()
+        adjacency = graph.prototype_adjacency(10, 0.3)
+        precision = graph.to_precision(adjacency)
+        covariance = graph.to_covariance(precision, rescale=False)
+        np.testing.assert_array_almost_equal(covariance, covariance.T)
+        np.testing.assert_array_almost_equal(np.dot(covariance, precision), np.eye(10))
+
+    def test_graph_to_covariance_not_spd(self):
+        graph = LatticeGraph()
+        with pytest.raises(np.linalg.LinAlgError):
+            graph.to_covariance(-np.eye(10))
+
+    def test_graph_create_redraws_not_spd(self):
+        class FlakyGraph(LatticeGraph):
+            n_precisions = 0
+
+            def to_precision(self, adjacency, **kwargs):
+                self.n_precisions += 1
+                if self.n_precisions == 1:
+                    return -np.eye(adjacency.shape[0])
+
+                return super(FlakyGraph, self).to_precision(adjacency, **kwargs)
+
+        graph = FlakyGraph()
+        covariance, precision, adjacency = graph.create(10, 0.3)
+        assert graph.n_precisions == 2
+        assert np.all(np.linalg.eigvalsh(covariance) > 0)
@@ -123,6 +123,11 @@ class TestMetrics(object):
                 np.array([[0, 1, 1], [1, 0, 0], [1, 0, 0]]),
                 0,
             ),
+            (
+                np.array([[0, 1, 0], [1, 2, 3], [0, 5, 0]]),
+                np.array([[4, 2, 0], [1, 0, 1], [0, 1, 4]]),
+                1,
+            ),
         ],
     )
     def test_has_exact_support(self, m, m_hat, expected):
@@ -1,6 +1,12 @@
 import numpy as np
 import pytest
+from sklearn.base import BaseEstimator
 
+from inverse_covariance import (
+    QuicGraphicalLasso,
+    QuicGraphicalLassoCV,
+    QuicGraphicalLassoEBIC,
+)
 from inverse_covariance.profiling import MonteCarloProfile
 
 
@@ -10,6 +16,34 @@ class FakeGraph(object):
         return identity, identity, identity
 
 
+class CountingGraph(FakeGraph):
+    def __init__(self):
+        self.n_created = 0
+
+    def create(self, n_features, alpha):
+        self.n_created += 1
+        return super(CountingGraph, self).create(n_features, alpha)
+
+
+class NestedEstimator(BaseEstimator):
+    """Fits its nested estimators in place (as AdaptiveGraphicalLasso does)."""
+
+    def __init__(self, lam=0.5, estimator=None, estimators=(), estimator_class=None):
+        self.lam = lam
+        self.estimator = estimator
+        self.estimators = estimators
+        self.estimator_class = estimator_class
+
+    def fit(self, X, y=None):
+        assert isinstance(self.estimator_class, type)
+        for estimator in [self.estimator] + list(self.estimators):
+            estimator.set_params(lam=self.lam)
+            estimator.fit(X)
+
+        self.precision_ = self.estimator.precision_
+        return self
+
+
 def fake_metric(a, b):
     return 0.5
 
@@ -98,3 +132,144 @@ class TestMonteCarloProfile(object):
             assert len(mc.alphas_) == mc.alpha_grid
         else:
             assert mc.alphas_ == mc.alpha_grid
+
+    @pytest.mark.parametrize(
+        "params_in,backend",
+        [
+            (
+                {
+                    "n_trials": 4,
+                    "n_features": 10,
+                    "graph": FakeGraph(),
+                    "ms_estimator": QuicGraphicalLassoEBIC(),
+                    "n_samples_grid": [5, 10],
+                    "alpha_grid": [0.2],
+                },
+                "threading",
+            ),
+            (
+                {
+                    "n_trials": 4,
+                    "n_features": 10,
+                    "graph": FakeGraph(),
+                    "ms_estimator": QuicGraphicalLassoEBIC(),
+                    "n_samples_grid": [5, 10],
+                    "alpha_grid": [0.2],
+                },
+                "multiprocessing",
+            ),
+        ],
+    )
+    def test_monte_carlo_profile_reproducible(self, params_in, backend):
+        """Per-trial seeding gives identical results for any n_jobs."""
+        mc_serial = MonteCarloProfile(n_jobs=1, **params_in)
+        mc_serial.fit()
+        mc_parallel = MonteCarloProfile(n_jobs=2, backend=backend, **params_in)
+        mc_parallel.fit()
+
+        for key in mc_serial.results_:
+            np.testing.assert_array_equal(
+                mc_serial.results_[key], mc_parallel.results_[key]
+            )
+
+    def test_monte_carlo_profile_invariants(self):
+        """One graph per alpha and the user mc_estimator is left untouched."""
+        graph = CountingGraph()
+        mc_estimator = QuicGraphicalLasso(lam=0.5)
+        mc = MonteCarloProfile(
+            n_trials=2,
+            n_features=10,
+            graph=graph,
+            ms_estimator=QuicGraphicalLassoEBIC(),
+            mc_estimator=mc_estimator,
+            n_samples_grid=[5, 10],
+            alpha_grid=[0.2, 0.3],
+        )
+        mc.fit()
+
+        assert graph.n_created == len(mc.alphas_)
+        assert mc_estimator.lam == 0.5
+        assert not hasattr(mc_estimator, "precision_")
+
+    def test_monte_carlo_profile_ms_warm_start(self):
+        mc = MonteCarloProfile(
+            n_trials=2,
+            n_features=10,
+            graph=FakeGraph(),
+            metrics=metrics,
+            n_samples_grid=[5, 10],
+            alpha_grid=[0.2, 0.3],
+            ms_warm_start=True,
+        )
+        mc.fit()
+
+        for key in metrics:
+            assert mc.results_[key].shape == (len(mc.alphas_), len(mc.grid_))
+            assert np.sum(mc.results_[key].flat) > 0
+
+        assert len(mc.precision_nnz_) == len(mc.alphas_) * len(mc.grid_)
+        assert mc.ms_estimator.lams == 4  # user estimator is left untouched
+
+    def test_monte_carlo_profile_ms_warm_start_narrows_path(self):
+        np.random.seed(0)  # QuicGraphicalLassoCV folds use the global rng
+        mc = MonteCarloProfile(
+            n_trials=2,
+            n_features=10,
+            graph=FakeGraph(),
+            ms_estimator=QuicGraphicalLassoCV(),
+            metrics=metrics,
+            n_samples_grid=[5, 10],
+            alpha_grid=[0.2],
+            ms_warm_start=True,
+        )
+        mc.fit()
+
+        # the second penalty is selected from the narrowed path around the
+        # first one, i.e. at one of its 1.5 ... 0.5 multiples
+        first_lam, second_lam = mc.lams_
+        assert np.min(np.abs(second_lam / first_lam - np.linspace(1.5, 0.5, 5))) < 1e-8
+
+    def test_monte_carlo_profile_ms_warm_start_requires_increasing_grid(self):
+        mc = MonteCarloProfile(
+            n_trials=2,
+            n_features=10,
+            graph=FakeGraph(),
+            n_samples_grid=[10, 5],
+            ms_warm_start=True,
+        )
+        with pytest.raises(ValueError):
+            mc.fit()
+
+    def test_monte_carlo_profile_ms_warm_start_requires_lams(self):
+        mc = MonteCarloProfile(
+            n_trials=2,
+            n_features=10,
+            graph=FakeGraph(),
+            ms_estimator=QuicGraphicalLassoEBIC(),
+            ms_warm_start=True,
+        )
+        with pytest.raises(ValueError):
+            mc.fit()
+
+    def test_monte_carlo_profile_nested_mc_estimator(self):
+        """Nested estimators of mc_estimator are not fit in place."""
+        nested = QuicGraphicalLasso(lam=0.5)
+        nested_in_list = QuicGraphicalLasso(lam=0.5)
+        mc = MonteCarloProfile(
+            n_trials=2,
+            n_features=10,
+            graph=FakeGraph(),
+            ms_estimator=QuicGraphicalLassoEBIC(),
+            mc_estimator=NestedEstimator(
+                estimator=nested,
+                estimators=[nested_in_list],
+                estimator_class=QuicGraphicalLasso,
+            ),
+            n_samples_grid=[5],
+            alpha_grid=[0.2],
+        )
+        mc.fit()
+
+        for estimator in [nested, nested_in_list]:
+            assert estimator.lam == 0.5
+            assert not hasattr(estimator, "precision_")